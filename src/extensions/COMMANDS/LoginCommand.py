@@ -17,11 +17,9 @@
 # -*- coding: utf-8 -*-
 """ Login Command for RDMC """
 
-import getpass
-import os
-import socket
-
-import redfish.ris
+import copy
+import functools
+from types import MappingProxyType
 
 try:
     from rdmc_helper import (
@@ -42,34 +40,92 @@ except ImportError:
         UsernamePasswordRequiredError,
     )
 
-from redfish.rest.v1 import ServerDownOrUnreachableError
+_HELP_FLAGS = frozenset(("-h", "--help"))
+_VNIC_URL = "https://16.1.15.1"
+_BLOBSTORE_URL = "blobstore://."
+
+# Command identity template, copied into each instance
+_IDENT = MappingProxyType(
+    {
+        "name": "login",
+        "usage": None,
+        "description": "To login remotely run using iLO url and iLO credentials"
+        "\n\texample: login <iLO url/hostname> -u <iLO username> "
+        "-p <iLO password>\n\n\tTo login on a local server run without "
+        "arguments\n\texample: login"
+        "\n\n\tTo login through VNIC run using --force_vnic and iLO credentials "
+        "\n\texample: login --force_vnic -u <iLO username> -p <iLO password>"
+        "\n\nLogin using OTP can be done in 2 ways."
+        "\n\n\t To login implicitly, use the tag --wait_for_otp."
+        "\n\t\texample: login -u <iLO username> -p <iLO password> --wait_for_otp"
+        "\n\n\n\t To login explicitly, use the tag -o/--otp and enter OTP after."
+        "\n\t\texample: login -u <iLO username> -p <iLO password> -o <iLO OTP>"
+        "\n\n\tNOTE: A [URL] can be specified with "
+        "an IPv4, IPv6, or hostname address.",
+        "summary": "Connects to a server, establishes a secure session," " and discovers data from iLO.",
+        "aliases": [],
+        "auxcommands": ["LogoutCommand"],
+        "cert_data": {},
+    }
+)
+
+# (option dest, config attribute) pairs filled from the config file when not given
+_CONFIG_FALLBACKS = (
+    ("user", "username"),
+    ("password", "password"),
+    ("user_certificate", "user_cert"),
+    ("user_root_ca_key", "user_root_ca_key"),
+    ("user_root_ca_password", "user_root_ca_password"),
+)
+
+
+def _redfish():
+    """Import the redfish library on first use, help output does not need it"""
+    import redfish.ris
+    import redfish.rest.v1
+
+    return redfish
+
+
+def _to_buffer(credential):
+    """Copy a credential into a bytearray so this command's own copy can be wiped"""
+    if isinstance(credential, str):
+        credential = credential.encode("utf-8")
+    return bytearray(credential)
+
+
+def _from_buffer(buf):
+    """Text of a credential buffer, only to be created when handing it to the login"""
+    return buf.decode("utf-8") if buf is not None else None
+
+
+def _wipe(buf):
+    """Overwrite a credential buffer with zeros in place"""
+    if buf:
+        buf[:] = bytes(len(buf))
+
+
+def _wants_help(line):
+    """Check a command line for a help flag with a single set test"""
+    if isinstance(line, str):
+        line = line.split()
+    return bool(_HELP_FLAGS.intersection(line or ()))
+
+
+@functools.lru_cache(maxsize=128)
+def _https_url(url):
+    """Prefix a url with https:// if it does not carry a scheme already"""
+    if not url.startswith(("https://", "http://")):
+        url = "https://" + url
+    return url
 
 
 class LoginCommand:
     """Constructor"""
 
     def __init__(self):
-        self.ident = {
-            "name": "login",
-            "usage": None,
-            "description": "To login remotely run using iLO url and iLO credentials"
-            "\n\texample: login <iLO url/hostname> -u <iLO username> "
-            "-p <iLO password>\n\n\tTo login on a local server run without "
-            "arguments\n\texample: login"
-            "\n\n\tTo login through VNIC run using --force_vnic and iLO credentials "
-            "\n\texample: login --force_vnic -u <iLO username> -p <iLO password>"
-            "\n\nLogin using OTP can be done in 2 ways."
-            "\n\n\t To login implicitly, use the tag --wait_for_otp."
-            "\n\t\texample: login -u <iLO username> -p <iLO password> --wait_for_otp"
-            "\n\n\n\t To login explicitly, use the tag -o/--otp and enter OTP after."
-            "\n\t\texample: login -u <iLO username> -p <iLO password> -o <iLO OTP>"
-            "\n\n\tNOTE: A [URL] can be specified with "
-            "an IPv4, IPv6, or hostname address.",
-            "summary": "Connects to a server, establishes a secure session," " and discovers data from iLO.",
-            "aliases": [],
-            "auxcommands": ["LogoutCommand"],
-            "cert_data": {},
-        }
+        # mutable values (lists, cert_data) are copied so instances never share them
+        self.ident = {key: copy.copy(value) for key, value in _IDENT.items()}
         self.cmdbase = None
         self.rdmc = None
         self.url = None
@@ -92,12 +148,12 @@ class LoginCommand:
         if help_disp:
             self.parser.print_help()
             return ReturnCodes.SUCCESS
+        if _wants_help(line):
+            self.parser.print_help()
+            return ReturnCodes.SUCCESS
         try:
             self.loginfunction(line)
 
-            if ("-h" in line) or ("--help" in line):
-                return ReturnCodes.SUCCESS
-
             if not self.rdmc.app.monolith._visited_urls:
                 self.auxcommands["logout"].run("")
                 raise PathUnavailableError("The path specified by the --path flag is unavailable.")
@@ -120,115 +176,75 @@ class LoginCommand:
         try:
             (options, args) = self.rdmc.rdmc_parse_arglist(self, line)
         except (InvalidCommandLineErrorOPTS, SystemExit):
-            if ("-h" in line) or ("--help" in line):
+            if _wants_help(line):
                 return ReturnCodes.SUCCESS
             else:
                 raise InvalidCommandLineError("Invalid command line arguments")
 
-        self.loginvalidation(options, args)
-
-        # if proxy server provided in command line as --useproxy, it will be used,
-        # otherwise it will the environment variable setting.
-        # else proxy will be set as None.
-        if self.rdmc.opts.proxy:
-            _ = self.rdmc.opts.proxy
-        elif "https_proxy" in os.environ and os.environ["https_proxy"]:
-            _ = os.environ["https_proxy"]
-        elif "http_proxy" in os.environ and os.environ["http_proxy"]:
-            _ = os.environ["http_proxy"]
-        else:
-            _ = self.rdmc.config.proxy
+        redfish = _redfish()
 
-        no_bundle = False
+        login_kwargs = {}
+        try:
+            # validation stores the credential buffers, so it runs under the finally below
+            self.loginvalidation(options, args)
+
+            od = vars(options)
+            ca_bundle = od.get("ca_cert_bundle")
+            user_cert = od.get("user_certificate")
+            user_key = od.get("user_root_ca_key")
+            user_key_password = od.get("user_root_ca_password")
+
+            user_ca_cert_data = {
+                key: value
+                for key, value in (
+                    ("ca_certs", ca_bundle),
+                    ("cert_file", user_cert),
+                    ("key_file", user_key),
+                    ("key_password", user_key_password),
+                )
+                if value
+            }
 
-        if getattr(options, "ca_cert_bundle", False):
-            user_ca_cert_data = {"ca_certs": options.ca_cert_bundle}
-        else:
-            user_ca_cert_data = {}
-        if getattr(options, "user_certificate", False):
-            no_bundle = True
-            user_ca_cert_data.update({"cert_file": options.user_certificate})
-        if getattr(options, "user_root_ca_key", False):
-            no_bundle = True
-            user_ca_cert_data.update({"key_file": options.user_root_ca_key})
-        if getattr(options, "user_root_ca_password", False):
-            no_bundle = True
-            user_ca_cert_data.update({"key_password": options.user_root_ca_password})
-
-        if not no_bundle:
-            if hasattr(user_ca_cert_data, "ca_certs"):
-                user_ca_cert_data.pop("ca_certs")
+            if not (user_cert or user_key or user_key_password):
+                user_ca_cert_data.pop("ca_certs", None)
 
-        try:
-            if getattr(options, "force_vnic", False):
+            if od.get("force_vnic"):
                 self.rdmc.ui.printer("\nAttempt to login with Vnic...\n")
-            try:
-                sock = socket.create_connection((args[0], 443))
-                if sock:
-                    sock.close
-            except:
-                pass
 
             self.sessionid = options.sessionid
             self.login_otp = options.login_otp
 
-            if options.waitforOTP:
-                try:
-                    self.rdmc.app.login(
-                        username=self.username,
-                        password=self.password,
-                        sessionid=self.sessionid,
-                        base_url=self.url,
-                        path=options.path,
-                        skipbuild=skipbuild,
-                        includelogs=options.includelogs,
-                        biospassword=self.biospassword,
-                        is_redfish=self.rdmc.opts.is_redfish,
-                        proxy=self.rdmc.opts.proxy,
-                        user_ca_cert_data=user_ca_cert_data,
-                        json_out=self.rdmc.json,
-                        login_otp=self.login_otp,
-                    )
-                except redfish.rest.connections.OneTimePasscodeError:
-                    self.rdmc.ui.printer("One Time Passcode Sent to registered email.\n")
-                    ans = input("Enter OTP: ")
-                    self.login_otp = ans
-                    self.rdmc.app.login(
-                        username=self.username,
-                        password=self.password,
-                        sessionid=self.sessionid,
-                        base_url=self.url,
-                        path=options.path,
-                        skipbuild=skipbuild,
-                        includelogs=options.includelogs,
-                        biospassword=self.biospassword,
-                        is_redfish=self.rdmc.opts.is_redfish,
-                        proxy=self.rdmc.opts.proxy,
-                        user_ca_cert_data=user_ca_cert_data,
-                        json_out=self.rdmc.json,
-                        login_otp=self.login_otp,
-                    )
-            else:
-                self.rdmc.app.login(
-                    username=self.username,
-                    password=self.password,
-                    sessionid=self.sessionid,
-                    base_url=self.url,
-                    path=options.path,
-                    skipbuild=skipbuild,
-                    includelogs=options.includelogs,
-                    biospassword=self.biospassword,
-                    is_redfish=self.rdmc.opts.is_redfish,
-                    proxy=self.rdmc.opts.proxy,
-                    user_ca_cert_data=user_ca_cert_data,
-                    json_out=self.rdmc.json,
-                    login_otp=self.login_otp,
-                )
-        except ServerDownOrUnreachableError as excp:
+            login_kwargs = {
+                "username": _from_buffer(self.username),
+                "password": _from_buffer(self.password),
+                "sessionid": self.sessionid,
+                "base_url": self.url,
+                "path": options.path,
+                "skipbuild": skipbuild,
+                "includelogs": options.includelogs,
+                "biospassword": self.biospassword,
+                "is_redfish": self.rdmc.opts.is_redfish,
+                "proxy": self.rdmc.opts.proxy,
+                "user_ca_cert_data": user_ca_cert_data,
+                "json_out": self.rdmc.json,
+                "login_otp": self.login_otp,
+            }
+            try:
+                self.rdmc.app.login(**login_kwargs)
+            except redfish.rest.connections.OneTimePasscodeError:
+                if not options.waitforOTP:
+                    raise
+                self.rdmc.ui.printer("One Time Passcode Sent to registered email.\n")
+                self.login_otp = login_kwargs["login_otp"] = input("Enter OTP: ")
+                self.rdmc.app.login(**login_kwargs)
+        except redfish.rest.v1.ServerDownOrUnreachableError as excp:
             self.rdmc.ui.printer("The following error occurred during login: '%s'\n" % str(excp.__class__.__name__))
-
-        self.username = None
-        self.password = None
+        finally:
+            login_kwargs.clear()
+            _wipe(self.username)
+            _wipe(self.password)
+            self.username = None
+            self.password = None
 
         # Warning for cache enabled, since we save session in plain text
         if not self.rdmc.encoding:
@@ -254,75 +270,71 @@ class LoginCommand:
         :param args: command line arguments
         :type args: list.
         """
-        # Fill user name/password from config file
-        if not options.user:
-            options.user = self.rdmc.config.username
-        if not options.password:
-            options.password = self.rdmc.config.password
-        if not hasattr(options, "user_certificate"):
-            options.user_certificate = self.rdmc.config.user_cert
-        if not hasattr(options, "user_root_ca_key"):
-            options.user_root_ca_key = self.rdmc.config.user_root_ca_key
-        if not hasattr(options, "user_root_ca_password"):
-            options.user_root_ca_password = self.rdmc.config.user_root_ca_password
+        od = vars(options)
+
+        # Fill user name/password and certificates from config file
+        config = self.rdmc.config
+        for opt, cfg_attr in _CONFIG_FALLBACKS:
+            if not od.get(opt):
+                od[opt] = getattr(config, cfg_attr, None)
 
         if (
             options.user
             and not options.password
             and (
-                not hasattr(options, "user_certificate")
-                or not hasattr(options, "user_root_ca_key")
-                or hasattr(options, "user_root_ca_password")
+                "user_certificate" not in od
+                or "user_root_ca_key" not in od
+                or "user_root_ca_password" in od
             )
         ):
             # Option for interactive entry of password
+            import getpass
+
             tempinput = getpass.getpass().rstrip()
             if tempinput:
                 options.password = tempinput
             else:
                 raise InvalidCommandLineError("Empty or invalid password was entered.")
 
-        if options.user:
-            self.username = options.user
+        if options.encode:
+            (user, password) = Encryption.decode_credentials_many(options.user, options.password)
+        else:
+            (user, password) = (options.user, options.password)
 
-        if options.password:
-            self.password = options.password
+        # Credentials are kept as bytearrays so loginfunction can wipe them after use
+        if user:
+            self.username = _to_buffer(user)
 
-        if options.encode:
-            self.username = Encryption.decode_credentials(self.username).decode("utf-8")
-            self.password = Encryption.decode_credentials(self.password).decode("utf-8")
+        if password:
+            self.password = _to_buffer(password)
 
         if options.biospassword:
             self.biospassword = options.biospassword
 
-        # Assignment of url in case no url is entered
-        if getattr(options, "force_vnic", False):
-            if not (getattr(options, "ca_cert_bundle", False) or getattr(options, "user_certificate", False)):
-                if not (self.username and self.password) and not options.sessionid:
-                    raise UsernamePasswordRequiredError("Please provide credentials to login with VNIC")
-            self.url = "https://16.1.15.1"
-        else:
-            self.url = "blobstore://."
+        if od.get("force_vnic") and not (od.get("ca_cert_bundle") or od.get("user_certificate")):
+            if not (self.username and self.password) and not options.sessionid:
+                raise UsernamePasswordRequiredError("Please provide credentials to login with VNIC")
 
         if args:
             # Any argument should be treated as an URL
-            self.url = args[0]
-
             # Verify that URL is properly formatted for https://
-            if "https://" not in self.url:
-                self.url = "https://" + self.url
+            self.url = _https_url(args[0])
 
             if not (
-                hasattr(options, "user_certificate")
-                or hasattr(options, "user_root_ca_key")
-                or hasattr(options, "user_root_ca_password")
+                "user_certificate" in od
+                or "user_root_ca_key" in od
+                or "user_root_ca_password" in od
             ):
                 if not (options.username and options.password):
                     raise InvalidCommandLineError("Empty username or password was entered.")
-        else:
+        elif self.rdmc.config.url:
             # Check to see if there is a URL in config file
-            if self.rdmc.config.url:
-                self.url = self.rdmc.config.url
+            self.url = self.rdmc.config.url
+        elif od.get("force_vnic"):
+            self.url = _VNIC_URL
+        else:
+            # Assignment of url in case no url is entered
+            self.url = _BLOBSTORE_URL
 
     def definearguments(self, customparser):
         """Wrapper function for new command main function
@@ -331,19 +343,14 @@ class LoginCommand:
         :type customparser: parser.
         """
 
-        def remove_argument(parser, arg):
-            for action in parser._actions:
-                opts = action.option_strings
-                if (opts and opts[0] == arg) or action.dest == arg:
-                    parser._remove_action(action)
-                    break
-
-            for action in parser._action_groups:
-                for group_action in action._group_actions:
-                    opts = group_action.option_strings
-                    if (opts and opts[0] == arg) or group_action.dest == arg:
-                        action._group_actions.remove(group_action)
-                        return
+        def remove_argument(by_opt, by_dest, arg):
+            action = by_opt.get(arg) or by_dest.get(arg)
+            if action:
+                # the owning group drops it from both its own and the parser's action lists
+                action.container._remove_action(action)
+                by_dest.pop(action.dest, None)
+                for opt in action.option_strings:
+                    by_opt.pop(opt, None)
 
         if not customparser:
             return
@@ -356,7 +363,9 @@ class LoginCommand:
             default=None,
         )
         self.cmdbase.add_login_arguments_group(customparser)
-        remove_argument(customparser, "url")
+        by_opt = {opt: action for action in customparser._actions for opt in action.option_strings}
+        by_dest = {action.dest: action for action in customparser._actions}
+        remove_argument(by_opt, by_dest, "url")
         customparser.add_argument(
             "--selector",
             dest="selector",
@@ -862,24 +862,32 @@ class Encryption:
         :returns: returns the decoded credential
         """
 
-        lib = risblobstore2.BlobStore2.gethprestchifhandle()
-        credbuff = create_string_buffer(credential.encode("utf-8"))
-        retbuff = create_string_buffer(128)
+        (decoded,) = Encryption.decode_credentials_many(credential)
+        return decoded
+
+    @staticmethod
+    def decode_credentials_many(*credentials):
+        """decode several encoded credentials, loading the chif library only once
+        :param credentials: credentials to be decoded
+        :type credentials: str.
+        :returns: returns a list of the decoded credentials, in order
+        """
 
+        lib = risblobstore2.BlobStore2.gethprestchifhandle()
         lib.decode_credentials.argtypes = [c_char_p]
 
-        lib.decode_credentials(credbuff, byref(retbuff))
+        decoded = []
+        try:
+            for credential in credentials:
+                credbuff = create_string_buffer(credential.encode("utf-8"))
+                retbuff = create_string_buffer(128)
 
-        risblobstore2.BlobStore2.unloadchifhandle(lib)
-        # try:
-        #    if isinstance(retbuff.value, bytes):
-        #        retbuff.value = retbuff.value.decode('utf-8', 'ignore')
-        #    if not retbuff.value:
-        #        raise UnableToDecodeError("")
-        # except:
-        #    raise UnableToDecodeError("Unable to decode credential %s." % credential)
-
-        return retbuff.value
+                lib.decode_credentials(credbuff, byref(retbuff))
+                decoded.append(retbuff.value)
+        finally:
+            risblobstore2.BlobStore2.unloadchifhandle(lib)
+
+        return decoded
 
     @staticmethod
     def encode_credentials(credential):